@@ -8,6 +8,12 @@ from PIL import Image
 from io import BytesIO
 from bilan_actif import structure_bilan_actif
 from bilan_passif import structure_bilan_passif
+from import_donnees import cle_import, lancer_import, lire_classeur, lire_texte
+from balance import generer_balance, ajouter_total
+from grand_livre import grand_livre_par_compte, indexer_comptes, lignes_compte
+from lettrage import COMPTES_TIERS, FENETRE_JOURS, lettrer
+from moteur_sql import EXEMPLE_REQUETE, moteur_sql
+from etats_financiers import MatriceBilan
 
 
 page_bg_img = f""" 
@@ -44,7 +50,7 @@ img_logo = Image.open("logo.png")
 st.sidebar.image(img_logo, use_container_width=True)
 st.sidebar.subheader("Etats Financiers SYSCOHADA")
 st.sidebar.write("**Sélectionnez une des options ci-dessous :**")
-menu = st.sidebar.radio("", ["Import Fichier", "Plan de comptes", "Grand Livre", "Balance", "Bilan Actif", "Bilan Passif", "Compte de Résultat","Flux de Trésorerie"])
+menu = st.sidebar.radio("", ["Import Fichier", "Plan de comptes", "Grand Livre", "Balance", "Lettrage", "Requêtes SQL", "Bilan Actif", "Bilan Passif", "Compte de Résultat","Flux de Trésorerie"])
 
 if menu == "Import Fichier":
     st.title("📊 :rainbow[Importation du fichier Excel]")
@@ -54,7 +60,13 @@ elif menu == "Grand Livre":
     st.title("📚 :rainbow[Grand Livre]")
 elif menu == "Balance":
     st.title("📅 :rainbow[Balance]")
+elif menu == "Lettrage":
+    st.title("🔗 :rainbow[Lettrage des comptes de tiers]")
+elif menu == "Requêtes SQL":
+    st.title("🔎 :rainbow[Requêtes SQL]")
 
+elif menu == "Bilan Actif":
+    st.title("🏦 :rainbow[Bilan Actif]")
 elif menu == "Bilan Passif":
     st.title("🏦 :rainbow[Bilan Passif]")
 elif menu == "Compte de Résultat":
@@ -66,36 +78,90 @@ elif menu == "Flux de Trésorerie":
 if "data_loaded" not in st.session_state:
     st.session_state.data_loaded = False
 
+# Bascule atomique vers le jeu de données importé en arrière-plan, une fois complet
+tache_import = st.session_state.get("import_en_cours")
+if tache_import is not None and tache_import.terminee and tache_import.erreur is None:
+    ancien = st.session_state.get("dataset")
+    st.session_state.dataset = tache_import.dataset
+    st.session_state.balance_par_annee = {}
+    st.session_state.balance_numerique_par_annee = {}
+    # Résultat de requête SQL calculé sur l'ancien jeu de données
+    st.session_state.pop("resultat_sql", None)
+    st.session_state.data_loaded = True
+    del st.session_state.import_en_cours
+    if ancien is not None and ancien is not tache_import.dataset:
+        ancien.liberer()
+elif tache_import is not None and tache_import.terminee:
+    # Échec conservé pour la page Import : seul un nouvel envoi du fichier relance la lecture
+    st.session_state.echec_import = {"envoi": st.session_state.get("envoi_import"), "erreur": tache_import.erreur}
+    del st.session_state.import_en_cours
+    st.toast("❌ L'import du fichier a échoué : voir la page Import Fichier.")
+
+# Suivi de l'import en cours, rafraîchi sans bloquer les autres pages (dessiné seulement pendant un import)
+@st.fragment(run_every=1)
+def suivi_import():
+    tache = st.session_state.get("import_en_cours")
+    if tache is None:
+        return
+    if tache.terminee:
+        st.rerun()
+    else:
+        st.progress(tache.progression, text=f"⏳ {tache.etape}")
+
+if st.session_state.get("import_en_cours") is not None:
+    with st.sidebar:
+        suivi_import()
+
 # Import
 modele_xlsx = "https://docs.google.com/spreadsheets/d/1ptu3NZel01nTKZh0_Mdl0HtU3SI-N49B/edit?usp=sharing&ouid=111747695521734603888&rtpof=true&sd=true"
 if menu == "Import Fichier":
-    uploaded_file = st.file_uploader("😊 **Importer le fichier Excel contenant le plan comptable et le grand livre**", type=["xlsx"])
-    with st.expander("✅ **Instructions relatives au fichier à importer**"):
-        st.write("Pour le bon fonctionnement de l'application, vous devez importer un Ficher Excel qui respectant les instructions ci-dessous :")
-        st.markdown("""**1.** Le fichier doit être sous l'extension : <span style="background-color:#28a745; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">.xlsx</span>""", unsafe_allow_html=True)
-        st.markdown("""**2.** Le fichier doit obligatoirement avoir deux feuilles : <span style="background-color:#1982C4; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">Plan de comptes</span> et <span style="background-color:#6A4C93; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">Grand Livre</span>. Vous devez respecter la casse.""", unsafe_allow_html=True)
-        st.markdown("**3.**  Vous pouvez utiliser le modèle suivant : [Modèle import.xlsx](%s)" % modele_xlsx)
-    
+    format_fichier = st.radio("Format du fichier", ["Classeur Excel (.xlsx)", "Fichier texte (CSV / FEC)"], horizontal=True)
+    if format_fichier == "Classeur Excel (.xlsx)":
+        uploaded_file = st.file_uploader("😊 **Importer le fichier Excel contenant le plan comptable et le grand livre**", type=["xlsx"])
+        plan_file = None
+        with st.expander("✅ **Instructions relatives au fichier à importer**"):
+            st.write("Pour le bon fonctionnement de l'application, vous devez importer un Ficher Excel qui respectant les instructions ci-dessous :")
+            st.markdown("""**1.** Le fichier doit être sous l'extension : <span style="background-color:#28a745; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">.xlsx</span>""", unsafe_allow_html=True)
+            st.markdown("""**2.** Le fichier doit obligatoirement avoir deux feuilles : <span style="background-color:#1982C4; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">Plan de comptes</span> et <span style="background-color:#6A4C93; color:white; padding:2px 6px; border-radius:4px; font-size:0.8em;">Grand Livre</span>. Vous devez respecter la casse.""", unsafe_allow_html=True)
+            st.markdown("**3.**  Vous pouvez utiliser le modèle suivant : [Modèle import.xlsx](%s)" % modele_xlsx)
+    else:
+        uploaded_file = st.file_uploader("😊 **Importer le grand livre au format texte (CSV, TSV ou FEC)**", type=["csv", "tsv", "txt"])
+        plan_file = st.file_uploader("📚 **Plan de comptes (facultatif)**", type=["xlsx", "csv"])
+        with st.expander("✅ **Instructions relatives au fichier à importer**"):
+            st.markdown("**1.** Le séparateur (tabulation, `|`, `;` ou `,`) et l'encodage (UTF-8 ou Latin-1) sont détectés automatiquement.")
+            st.markdown("**2.** Le fichier doit avoir soit les colonnes du FEC (`EcritureDate`, `JournalCode`, `PieceRef`, `CompteNum`, `EcritureLib`, `Debit`, `Credit`...), soit les colonnes `Date`, `Journal`, `AN`, `Référence`, `Compte`, `Libellé`, `Débit`, `Crédit`.")
+            st.markdown("**3.** Sans plan de comptes (feuille **Plan de comptes** d'un classeur ou fichier CSV), un plan minimal est déduit des comptes du grand livre : classes 1 à 5 au Bilan, 6 à 8 au Résultat, sans codes BD/BC/RD/RC.")
+
+    echec = st.session_state.get("echec_import")
     if uploaded_file:
-        try:
-            plan_df = pd.read_excel(uploaded_file, sheet_name="Plan de comptes", header=0, usecols="A:G")
-            gl_df = pd.read_excel(uploaded_file, sheet_name="Grand Livre", header=0, usecols="A:J")
-            gl_df['Date'] = pd.to_datetime(gl_df['Date'], errors='coerce').dt.strftime('%d/%m/%Y')
-            
-            # Nettoyage des colonnes
-            gl_df.columns = gl_df.columns.str.strip()
-            plan_df.columns = plan_df.columns.str.strip()
-
-            # Standardisation des comptes
-            gl_df['Compte'] = gl_df['Compte'].astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
-            plan_df['Compte'] = plan_df['Compte'].astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
-
-            st.session_state.plan_df = plan_df
-            st.session_state.gl_df = gl_df
-            st.session_state.data_loaded = True
+        # Lecture en arrière-plan : les autres pages restent utilisables avec le fichier précédent
+        donnees = uploaded_file.getvalue()
+        plan = plan_file.getvalue() if plan_file else None
+        cle = cle_import(donnees, plan)
+        envoi = (cle, uploaded_file.file_id, plan_file.file_id if plan_file else None)
+        dataset = st.session_state.get("dataset")
+        tache = st.session_state.get("import_en_cours")
+        if echec is not None and echec["envoi"] == envoi:
+            st.error(f"❌ Erreur lors de la lecture du fichier : {echec['erreur']}")
+            st.caption("Corrigez le fichier puis importez-le à nouveau pour relancer la lecture.")
+        elif dataset is not None and dataset.cle == cle:
             st.success("✅ Fichier importé avec succès.")
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la lecture du fichier : {e}")
+            montants_invalides = dataset.derive("montants_invalides")
+            if montants_invalides:
+                st.warning(f"⚠️ {montants_invalides} montant(s) non numérique(s) ramené(s) à 0 : vérifiez les colonnes Débit et Crédit du fichier.")
+        elif tache is not None and tache.cle == cle:
+            st.info("⏳ Import lancé en arrière-plan, vous pouvez continuer à consulter les autres pages.")
+        else:
+            lire = lire_classeur if format_fichier == "Classeur Excel (.xlsx)" else lire_texte
+            st.session_state.import_en_cours = lancer_import(donnees, lire=lire, plan=plan)
+            st.session_state.envoi_import = envoi
+            st.session_state.pop("echec_import", None)
+            # Nouvelle exécution pour afficher le suivi de l'import dans la barre latérale
+            st.rerun()
+    elif echec is not None:
+        # Échec d'un import précédent, signalé même après le retrait du fichier
+        st.error(f"❌ Erreur lors de la lecture du fichier : {echec['erreur']}")
+        st.caption("Corrigez le fichier puis importez-le à nouveau pour relancer la lecture.")
 
 # Plan de comptes
 elif menu == "Plan de comptes":
@@ -103,7 +169,7 @@ elif menu == "Plan de comptes":
         st.warning("📂 Veuillez d'abord importer un fichier Excel via le menu **Import Fichier**.")
     else:
         st.subheader("Liste des comptes importés depuis le fichier Excel.")
-        st.dataframe(st.session_state.plan_df, use_container_width=True)
+        st.dataframe(st.session_state.dataset.plan_df, use_container_width=True)
 
 # Grand Livre
 elif menu == "Grand Livre":
@@ -113,23 +179,8 @@ elif menu == "Grand Livre":
         st.subheader("Écritures comptables importéses depuis le fichier Excel")
         st.write("**Sélectionnez les filtres à gauche pour affiner votre recherche ou analyse.**")
 
-        # Copier le DataFrame
-        gl_df = st.session_state.gl_df.copy()
-
-        # Convertir la colonne Date
-        if "Date" in gl_df.columns:
-            gl_df["Date"] = pd.to_datetime(gl_df["Date"], format='%d/%m/%Y', errors='coerce')
-            gl_df["Date "] = gl_df["Date"].dt.strftime('%d/%m/%Y')
-            gl_df["Année"] = gl_df["Date"].dt.year
-            gl_df["Mois"] = gl_df["Date"].dt.strftime("%Y%m")
-
-        # Convertir la colonne 'Année' en entier pour enlever la partie décimale
-        gl_df["Année"] = gl_df["Année"].fillna(0).astype(int)
-
-        # Remplir les valeurs manquantes dans Débit et Crédit
-        for col in ["Débit", "Crédit"]:
-            if col in gl_df.columns:
-                gl_df[col] = pd.to_numeric(gl_df[col], errors="coerce").fillna(0)
+        # Vue en lecture seule sur le jeu de données partagé (Dates, Année, Mois et montants préparés à l'import)
+        gl_df = st.session_state.dataset.gl_df
 
         # Filtres
         st.sidebar.header("🧮 Filtres")
@@ -140,16 +191,25 @@ elif menu == "Grand Livre":
         annee_filter = st.sidebar.multiselect("Année", options=sorted(gl_df["Année"].dropna().unique()))
         mois_filter = st.sidebar.multiselect("Mois", options=sorted(gl_df["Mois"].dropna().unique()))
 
-        if journal_filter:
-            gl_df = gl_df[gl_df["Journal"].isin(journal_filter)]
-        if an_filter:
-            gl_df = gl_df[gl_df["AN"].isin(an_filter)]
-        if compte_filter:
-            gl_df = gl_df[gl_df["Compte"].isin(compte_filter)]
-        if annee_filter:
-            gl_df = gl_df[gl_df["Année"].isin(annee_filter)]
-        if mois_filter:
-            gl_df = gl_df[gl_df["Mois"].isin(mois_filter)]
+        def masque_filtres(df, filtres):
+            # Masque combiné des filtres actifs, None si aucun (la page lit alors le Grand Livre partagé tel quel)
+            filtres = [(col, valeurs) for col, valeurs in filtres if valeurs]
+            if not filtres:
+                return None
+            masque = df[filtres[0][0]].isin(filtres[0][1])
+            for col, valeurs in filtres[1:]:
+                masque &= df[col].isin(valeurs)
+            return masque
+
+        # Compte et Année délimitent les soldes progressifs ; Journal, AN et Mois ne font que masquer des lignes
+        filtres_comptes = [("Compte", compte_filter), ("Année", annee_filter)]
+        filtres_lignes = [("Journal", journal_filter), ("AN", an_filter), ("Mois", mois_filter)]
+        gl_comptes = gl_df
+        masque = masque_filtres(gl_comptes, filtres_comptes)
+        if masque is not None:
+            gl_comptes = gl_comptes[masque]
+        visibles = masque_filtres(gl_comptes, filtres_lignes)
+        gl_df = gl_comptes if visibles is None else gl_comptes[visibles]
 
         # Calculs
         total_debit = gl_df["Débit"].sum()
@@ -216,27 +276,55 @@ elif menu == "Grand Livre":
         # Espacement
         st.markdown("<br>", unsafe_allow_html=True)
 
-        # Formater les colonnes Débit / Crédit pour affichage
-        gl_df["Débit"] = gl_df["Débit"].apply(lambda x: format_int(x))
-        gl_df["Crédit"] = gl_df["Crédit"].apply(lambda x: format_int(x))
+        mode_affichage = st.radio("Affichage", ["Écritures", "Grand Livre par compte"], horizontal=True)
+
+        if mode_affichage == "Grand Livre par compte":
+            # Soldes progressifs recalculés à chaque affichage : un tri et une somme cumulée groupée sur toutes les
+            # lignes des comptes et exercices retenus, les filtres Journal / AN / Mois masquant ensuite le résultat
+            gl_par_compte = grand_livre_par_compte(gl_comptes, visibles)
+            montants = ["Débit", "Crédit", "Solde progressif"]
+
+            # Tableau : format numérique côté navigateur (pas de Styler, limité à 262 144 cellules)
+            st.dataframe(gl_par_compte, use_container_width=True, hide_index=True,
+                         column_config={col: st.column_config.NumberColumn(col, format="localized") for col in montants})
+
+            # Export Excel : montants numériques, format appliqué par colonne
+            excel_buffer = io.BytesIO()
+            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+                gl_par_compte.to_excel(writer, index=False, sheet_name="Grand Livre par compte")
+                format_montant = writer.book.add_format({"num_format": "#,##0"})
+                for position, col in enumerate(gl_par_compte.columns):
+                    if col in montants:
+                        writer.sheets["Grand Livre par compte"].set_column(position, position, 16, format_montant)
+
+            st.download_button(
+                label="📥 Exporter en Excel",
+                data=excel_buffer.getvalue(),
+                file_name="grand_livre_par_compte.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        else:
+            colonnes_affichage = ["Date", "Journal", "AN", "Référence", "Compte", "Libellé", "Débit", "Crédit"]
+            colonnes_presentes = [col for col in colonnes_affichage if col in gl_df.columns]
 
-        colonnes_affichage = ["Date ", "Journal", "AN", "Référence", "Compte", "Libellé", "Débit", "Crédit"]
-        colonnes_presentes = [col for col in colonnes_affichage if col in gl_df.columns]
+            # Formater les colonnes Débit / Crédit pour affichage (sur la vue filtrée uniquement)
+            gl_affiche = gl_df[colonnes_presentes]
+            gl_affiche = gl_affiche.assign(**{col: gl_affiche[col].apply(format_int) for col in ["Débit", "Crédit"]})
 
-        # Tableau
-        st.dataframe(gl_df[colonnes_presentes], use_container_width=True)
+            # Tableau
+            st.dataframe(gl_affiche, use_container_width=True)
 
-        # Export Excel
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-            gl_df[colonnes_presentes].to_excel(writer, index=False, sheet_name="Grand Livre")
+            # Export Excel
+            excel_buffer = io.BytesIO()
+            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+                gl_affiche.to_excel(writer, index=False, sheet_name="Grand Livre")
 
-        st.download_button(
-            label="📥 Exporter en Excel",
-            data=excel_buffer.getvalue(),
-            file_name="grand_livre_filtré.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+            st.download_button(
+                label="📥 Exporter en Excel",
+                data=excel_buffer.getvalue(),
+                file_name="grand_livre_filtré.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
 # Balance
 elif menu == "Balance":
@@ -245,23 +333,12 @@ elif menu == "Balance":
     else:
         st.subheader("Balance à 8 colonnes générée à partir du Grand Livre")
         st.write("**Sélectionnez les filtres à gauche pour affiner votre recherche ou analyse. Vous pouvez aussi télécharger la balance au format Excel.**")
-        plan_df = st.session_state.plan_df
-        gl_df = st.session_state.gl_df
-
-        # Vérification colonne Année
-        if "Année" not in gl_df.columns:
-            st.warning("❗ La colonne 'Année' n'a pas été trouvée automatiquement.")
-            annee_col = st.selectbox("Sélectionnez la colonne correspondant à l'année :", gl_df.columns)
-        else:
-            annee_col = "Année"
-
-        # Nettoyage et conversion
-        gl_df['Débit'] = pd.to_numeric(gl_df['Débit'], errors='coerce').fillna(0)
-        gl_df['Crédit'] = pd.to_numeric(gl_df['Crédit'], errors='coerce').fillna(0)
-        gl_df['AN'] = gl_df['AN'].fillna("NON")
+        dataset = st.session_state.dataset
+        plan_df = dataset.plan_df
+        gl_df = dataset.gl_df
 
         # Sidebar : Filtres
-        annees = sorted([int(a) for a in gl_df[annee_col].dropna().unique()])
+        annees = sorted([int(a) for a in gl_df["Année"].unique() if a > 0])
         annee_choisie = st.sidebar.selectbox("📅 Choisir l'année", annees)
 
         tableaux = sorted(plan_df['Tableau'].dropna().unique())
@@ -270,73 +347,18 @@ elif menu == "Balance":
         classes = sorted(plan_df['Compte'].astype(str).str[0].unique())
         classes_choisies = st.sidebar.multiselect("🏷️ Choisir les classes de comptes", classes, default=classes)
 
-        # Filtres appliqués
-        comptes_classes = plan_df[plan_df['Compte'].astype(str).str[0].isin(classes_choisies)]
-        comptes_tableaux = comptes_classes[comptes_classes['Tableau'].isin(tableaux_choisis)]
-        gl_df = gl_df[gl_df['Compte'].isin(comptes_tableaux['Compte'])]
-
-        gl_annee = gl_df[gl_df[annee_col] == annee_choisie]
-        gl_si = gl_annee[gl_annee['AN'].str.upper() == 'OUI']
-        gl_mouv = gl_annee[gl_annee['AN'].str.upper() != 'OUI']
-
-        def aggregate(df, col_name):
-            return df.groupby('Compte')[[col_name]].sum().rename(columns={col_name: col_name})
-
-        si_debit = aggregate(gl_si, 'Débit')
-        si_credit = aggregate(gl_si, 'Crédit')
-        mouv_debit = aggregate(gl_mouv, 'Débit')
-        mouv_credit = aggregate(gl_mouv, 'Crédit')
-
-        balance = comptes_tableaux.set_index('Compte').copy()
-        balance = balance.join(si_debit.rename(columns={"Débit": "SI Débit"}), how="left")
-        balance = balance.join(si_credit.rename(columns={"Crédit": "SI Crédit"}), how="left")
-        balance = balance.join(mouv_debit.rename(columns={"Débit": "Mouv Débit"}), how="left")
-        balance = balance.join(mouv_credit.rename(columns={"Crédit": "Mouv Crédit"}), how="left")
-
-        for col in ["SI Débit", "SI Crédit", "Mouv Débit", "Mouv Crédit"]:
-            balance[col] = balance[col].fillna(0)
-
-        balance["SF Débit"] = (balance["SI Débit"] + balance["Mouv Débit"] - balance["SI Crédit"] - balance["Mouv Crédit"]).apply(lambda x: x if x > 0 else 0)
-        balance["SF Crédit"] = (balance["SI Crédit"] + balance["Mouv Crédit"] - balance["SI Débit"] - balance["Mouv Débit"]).apply(lambda x: x if x > 0 else 0)
-
-        # Colonnes BD, BC, RD, RC doivent exister même si vides
-        for col in ["BD", "BC", "RD", "RC"]:
-            if col not in balance.columns:
-                balance[col] = ""
-
-        # Nouvelle colonne : Code Bilan
-        balance["Code Bilan"] = balance.apply(
-            lambda row: row["BD"] if row["Tableau"] == "Bilan" and row["SF Débit"] > 0 else
-                        row["BC"] if row["Tableau"] == "Bilan" and row["SF Crédit"] > 0 else "N/A", axis=1
-        )
-
-        # Nouvelle colonne : Code Résultat
-        balance["Code Résultat"] = balance.apply(
-            lambda row: row["RD"] if row["Tableau"] == "Résultat" and row["SF Débit"] > 0 else
-                        row["RC"] if row["Tableau"] == "Résultat" and row["SF Crédit"] > 0 else "N/A", axis=1
+        # Balance calculée une seule fois par fichier et par jeu de filtres, partagée entre les sessions
+        balance = dataset.memoiser(
+            ("balance", annee_choisie, tuple(tableaux_choisis), tuple(classes_choisies)),
+            lambda: generer_balance(plan_df, gl_df, annee_choisie, tableaux_choisis, classes_choisies,
+                                    moteur=dataset.derive("moteur_sql"))
         )
+        balance_with_total = ajouter_total(balance)
 
-        balance = balance.reset_index()
-
-        colonnes = ["Compte", "Intitulé", "Tableau", "BD", "BC", "RD", "RC",
-                    "SI Débit", "SI Crédit", "Mouv Débit", "Mouv Crédit", "SF Débit", "SF Crédit",
-                    "Code Bilan", "Code Résultat"]
-
-        # Totaux
-        totaux = balance[colonnes[7:13]].sum(numeric_only=True).to_dict()
-        total_row = {
-            "Compte": "Total", "Intitulé": "", "Tableau": "", "BD": "", "BC": "", "RD": "", "RC": "",
-            "Code Bilan": "", "Code Résultat": ""
-        }
-        total_row.update({col: round(totaux.get(col, 0), 2) for col in colonnes[7:13]})
-        balance_with_total = balance[colonnes].copy()
-        balance_with_total.loc[len(balance_with_total)] = total_row
-
-        
-        # Sauvegarde des valeurs numériques brutes de la balance
+        # Sauvegarde des valeurs numériques brutes de la balance (référence partagée, pas de copie)
         if "balance_numerique_par_annee" not in st.session_state:
             st.session_state.balance_numerique_par_annee = {}
-        st.session_state.balance_numerique_par_annee[annee_choisie] = balance.copy()
+        st.session_state.balance_numerique_par_annee[annee_choisie] = balance
 
         # Format montant
         def format_int(val):
@@ -349,8 +371,19 @@ elif menu == "Balance":
             balance_with_total[col] = balance_with_total[col].apply(lambda x: format_int(x))
         
 
-        # Affichage
-        st.dataframe(balance_with_total, use_container_width=True)
+        # Affichage : un clic sur une ligne affiche les écritures du compte
+        selection = st.dataframe(balance_with_total, use_container_width=True,
+                                 on_select="rerun", selection_mode="single-row")
+
+        lignes_choisies = selection.selection.rows
+        if lignes_choisies and balance_with_total.iloc[lignes_choisies[0]]["Compte"] != "Total":
+            compte_choisi = balance_with_total.iloc[lignes_choisies[0]]["Compte"]
+            index_comptes = dataset.memoiser("index_comptes", lambda: indexer_comptes(gl_df))
+            ecritures = lignes_compte(gl_df, index_comptes, compte_choisi, annee_choisie)
+            st.markdown(f"**Écritures du compte {compte_choisi} ({annee_choisie}) : {len(ecritures)} ligne(s)**")
+            colonnes_ecritures = [col for col in ["Date", "Journal", "AN", "Référence", "Compte", "Libellé", "Débit", "Crédit"]
+                                  if col in ecritures.columns]
+            st.dataframe(ecritures[colonnes_ecritures], use_container_width=True, hide_index=True)
 
         # Export Excel : toutes classes
         output_excel_all_classes = io.BytesIO()
@@ -382,4 +415,152 @@ elif menu == "Balance":
             st.session_state.balance_par_annee = {}
 
         # On enregistre la balance de l'année sélectionnée dans la session
-        st.session_state.balance_par_annee[annee_choisie] = balance_with_total.copy()
+        st.session_state.balance_par_annee[annee_choisie] = balance_with_total
+
+# Lettrage
+elif menu == "Lettrage":
+    if not st.session_state.data_loaded:
+        st.warning("📂 Veuillez d'abord importer un fichier Excel via le menu **Import Fichier**.")
+    else:
+        st.subheader("Rapprochement automatique des débits et crédits des comptes clients et fournisseurs")
+        st.write("**Les écritures sont d'abord lettrées sur la référence et le montant, puis sur le montant et la proximité des dates.**")
+        dataset = st.session_state.dataset
+        gl_df = dataset.gl_df
+
+        # Sidebar : paramètres du lettrage
+        st.sidebar.header("🔗 Paramètres")
+        racines = sorted(gl_df.loc[gl_df["Compte"].str.startswith("4"), "Compte"].str[:3].unique())
+        comptes_choisis = st.sidebar.multiselect("Racines de comptes à lettrer", racines,
+                                                 default=[c for c in COMPTES_TIERS if c in racines])
+        fenetre = st.sidebar.slider("Écart maximal entre les dates (jours)", 0, 365, FENETRE_JOURS)
+        annees = sorted([int(a) for a in gl_df["Année"].unique() if a > 0])
+        annee_choisie = st.sidebar.selectbox("📅 Exercice", annees, index=len(annees) - 1 if annees else None)
+
+        # Paramétrage par défaut : lettrage partagé entre les sessions du même fichier.
+        # Autre paramétrage : seul le dernier calcul est gardé, dans la session.
+        parametres = (dataset.cle, tuple(sorted(comptes_choisis)), fenetre)
+        if parametres[1:] == (tuple(sorted(c for c in COMPTES_TIERS if c in racines)), FENETRE_JOURS):
+            lettrage = dataset.memoiser(("lettrage",) + parametres[1:], lambda: lettrer(gl_df, comptes_choisis, fenetre))
+        else:
+            dernier = st.session_state.get("lettrage_session")
+            if dernier is None or dernier[0] != parametres:
+                dernier = (parametres, lettrer(gl_df, comptes_choisis, fenetre))
+                st.session_state.lettrage_session = dernier
+            lettrage = dernier[1]
+        colonnes = ["Date", "Journal", "Référence", "Compte", "Libellé", "Débit", "Crédit"]
+        # Un exercice à la fois : ses à-nouveaux reprennent déjà les pièces ouvertes de l'exercice précédent
+        lettrage = lettrage[gl_df.loc[lettrage.index, "Année"] == annee_choisie]
+        lignes = gl_df.loc[lettrage.index, colonnes].join(lettrage)
+        ouvertes = lignes[lignes["Lettre"] == ""]
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Lignes lettrées", f"{len(lignes) - len(ouvertes):,}".replace(",", " "))
+        col2.metric("Lignes non lettrées", f"{len(ouvertes):,}".replace(",", " "))
+        col3.metric("Solde non lettré", f"{int(ouvertes['Débit'].sum() - ouvertes['Crédit'].sum()):,}".replace(",", " "))
+
+        affichage = st.radio("Afficher", ["Écritures non lettrées", "Toutes les écritures"], horizontal=True)
+        tableau = ouvertes if affichage == "Écritures non lettrées" else lignes
+        st.dataframe(tableau, use_container_width=True, hide_index=True,
+                     column_config={col: st.column_config.NumberColumn(col, format="localized") for col in ["Débit", "Crédit"]})
+
+        # Export Excel
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+            ouvertes.to_excel(writer, index=False, sheet_name="Non lettrées")
+            lignes.to_excel(writer, index=False, sheet_name="Lettrage")
+
+        st.download_button(
+            label="📥 Exporter en Excel",
+            data=excel_buffer.getvalue(),
+            file_name=f"lettrage_{annee_choisie}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+# Requêtes SQL
+elif menu == "Requêtes SQL":
+    if not st.session_state.data_loaded:
+        st.warning("📂 Veuillez d'abord importer un fichier Excel via le menu **Import Fichier**.")
+    else:
+        dataset = st.session_state.dataset
+        with st.spinner("Préparation de la base SQL..."):
+            moteur = moteur_sql(dataset)
+
+        st.subheader(f"Interrogation du Grand Livre et du plan de comptes ({moteur.moteur})")
+        st.write("**Les tables `grand_livre` et `plan_de_comptes` sont en lecture seule. Les noms de colonnes accentués s'écrivent entre guillemets, par exemple `\"Débit\"`.**")
+
+        with st.expander("📋 Tables et colonnes disponibles"):
+            st.dataframe(moteur.tables(), use_container_width=True, hide_index=True)
+
+        sql = st.text_area("Requête", value=EXEMPLE_REQUETE, height=180)
+        if st.button("▶️ Exécuter"):
+            try:
+                st.session_state.resultat_sql = moteur.requete(sql)
+            except Exception as e:
+                st.session_state.resultat_sql = None
+                st.error(f"❌ Erreur dans la requête : {e}")
+
+        resultat = st.session_state.get("resultat_sql")
+        if resultat is not None:
+            st.write(f"**{len(resultat)} ligne(s)**")
+            st.dataframe(resultat, use_container_width=True, hide_index=True)
+
+            # Export Excel
+            excel_buffer = io.BytesIO()
+            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+                resultat.to_excel(writer, index=False, sheet_name="Requête")
+
+            st.download_button(
+                label="📥 Exporter en Excel",
+                data=excel_buffer.getvalue(),
+                file_name="requete_sql.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+
+
+# Bilan Actif / Bilan Passif
+elif menu in ["Bilan Actif", "Bilan Passif"]:
+    if not st.session_state.data_loaded:
+        st.warning("📂 Veuillez d'abord importer un fichier Excel via le menu **Import Fichier**.")
+    else:
+        st.subheader(f"{menu} établi à partir de la balance et des codes BD / BC du plan de comptes")
+        dataset = st.session_state.dataset
+        plan_df = dataset.plan_df
+        gl_df = dataset.gl_df
+
+        annees = sorted([int(a) for a in gl_df["Année"].unique() if a > 0])
+        if not annees:
+            st.warning("❗ Aucune écriture datée dans le Grand Livre.")
+            st.stop()
+        annee_n = st.sidebar.selectbox("📅 Année N", annees, index=len(annees) - 1)
+        annees_bilan = [a for a in [annee_n, annee_n - 1] if a in annees]
+
+        # Balances complètes (mêmes clés que la page Balance avec tous les filtres), partagées entre les sessions
+        tableaux = sorted(plan_df['Tableau'].dropna().unique())
+        classes = sorted(plan_df['Compte'].astype(str).str[0].unique())
+        moteur = dataset.derive("moteur_sql")
+        balances = {
+            f"Année {a}": dataset.memoiser(
+                ("balance", a, tuple(tableaux), tuple(classes)),
+                lambda a=a: generer_balance(plan_df, gl_df, a, tableaux, classes, moteur=moteur)
+            )
+            for a in annees_bilan
+        }
+
+        # Plan compilé une fois en matrices creuses, puis un seul produit pour toutes les années
+        matrice = dataset.memoiser("matrice_bilan", lambda: MatriceBilan(plan_df))
+        bilan_df = matrice.bilan_actif(balances) if menu == "Bilan Actif" else matrice.bilan_passif(balances)
+
+        st.dataframe(bilan_df.style.format(precision=0, thousands=" ", subset=list(balances)),
+                     use_container_width=True, hide_index=True)
+
+        # Export Excel
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+            bilan_df.to_excel(writer, index=False, sheet_name=menu)
+
+        st.download_button(
+            label="📥 Exporter en Excel",
+            data=excel_buffer.getvalue(),
+            file_name=f"{menu.lower().replace(' ', '_')}_{annee_n}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
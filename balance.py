@@ -0,0 +1,80 @@
+import pandas as pd
+
+
+COLONNES_BALANCE = ["Compte", "Intitulé", "Tableau", "BD", "BC", "RD", "RC",
+                    "SI Débit", "SI Crédit", "Mouv Débit", "Mouv Crédit", "SF Débit", "SF Crédit",
+                    "Code Bilan", "Code Résultat"]
+
+COLONNES_MONTANTS = COLONNES_BALANCE[7:13]
+
+
+SQL_SOMMES = """
+SELECT "Compte",
+       SUM(CASE WHEN UPPER("AN") = 'OUI' THEN "Débit" ELSE 0 END) AS "SI Débit",
+       SUM(CASE WHEN UPPER("AN") = 'OUI' THEN "Crédit" ELSE 0 END) AS "SI Crédit",
+       SUM(CASE WHEN UPPER("AN") <> 'OUI' THEN "Débit" ELSE 0 END) AS "Mouv Débit",
+       SUM(CASE WHEN UPPER("AN") <> 'OUI' THEN "Crédit" ELSE 0 END) AS "Mouv Crédit"
+FROM grand_livre
+WHERE "Année" = ?
+GROUP BY "Compte"
+"""
+
+
+def _sommes_pandas(gl_df, annee, comptes, annee_col):
+    gl_annee = gl_df[(gl_df[annee_col] == annee) & gl_df['Compte'].isin(comptes)]
+    est_an = gl_annee['AN'].str.upper() == 'OUI'
+
+    # Un seul groupby par nature d'écriture (à-nouveaux / mouvements)
+    si = gl_annee[est_an].groupby('Compte')[['Débit', 'Crédit']].sum()
+    mouv = gl_annee[~est_an].groupby('Compte')[['Débit', 'Crédit']].sum()
+    return si.rename(columns={"Débit": "SI Débit", "Crédit": "SI Crédit"}).join(
+        mouv.rename(columns={"Débit": "Mouv Débit", "Crédit": "Mouv Crédit"}), how="outer")
+
+
+def generer_balance(plan_df, gl_df, annee, tableaux, classes, annee_col="Année", moteur=None):
+    # Filtres appliqués
+    comptes_classes = plan_df[plan_df['Compte'].astype(str).str[0].isin(classes)]
+    comptes_tableaux = comptes_classes[comptes_classes['Tableau'].isin(tableaux)]
+
+    # Agrégation déléguée au moteur SQL quand il est disponible, sinon groupby pandas (qui gère aussi l'absence d'année)
+    if moteur is not None and annee is not None:
+        sommes = moteur.requete(SQL_SOMMES, [int(annee)]).set_index("Compte")
+    else:
+        sommes = _sommes_pandas(gl_df, annee, comptes_tableaux['Compte'], annee_col)
+
+    # Jointure à gauche depuis le plan : seuls les comptes filtrés sont conservés
+    balance = comptes_tableaux.set_index('Compte').join(sommes, how="left")
+
+    for col in ["SI Débit", "SI Crédit", "Mouv Débit", "Mouv Crédit"]:
+        balance[col] = balance[col].fillna(0)
+
+    solde = balance["SI Débit"] + balance["Mouv Débit"] - balance["SI Crédit"] - balance["Mouv Crédit"]
+    balance["SF Débit"] = solde.clip(lower=0)
+    balance["SF Crédit"] = (-solde).clip(lower=0)
+
+    # Colonnes BD, BC, RD, RC doivent exister même si vides
+    for col in ["BD", "BC", "RD", "RC"]:
+        if col not in balance.columns:
+            balance[col] = ""
+
+    # Nouvelle colonne : Code Bilan
+    bilan = balance["Tableau"] == "Bilan"
+    balance["Code Bilan"] = balance["BD"].where(bilan & (balance["SF Débit"] > 0),
+                                                balance["BC"].where(bilan & (balance["SF Crédit"] > 0), "N/A"))
+
+    # Nouvelle colonne : Code Résultat
+    resultat = balance["Tableau"] == "Résultat"
+    balance["Code Résultat"] = balance["RD"].where(resultat & (balance["SF Débit"] > 0),
+                                                   balance["RC"].where(resultat & (balance["SF Crédit"] > 0), "N/A"))
+
+    return balance.reset_index()
+
+
+def ajouter_total(balance):
+    totaux = balance[COLONNES_MONTANTS].sum(numeric_only=True).to_dict()
+    total_row = {
+        "Compte": "Total", "Intitulé": "", "Tableau": "", "BD": "", "BC": "", "RD": "", "RC": "",
+        "Code Bilan": "", "Code Résultat": ""
+    }
+    total_row.update({col: round(totaux.get(col, 0), 2) for col in COLONNES_MONTANTS})
+    return pd.concat([balance[COLONNES_BALANCE], pd.DataFrame([total_row])], ignore_index=True)
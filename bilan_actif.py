@@ -28,4 +28,16 @@ structure_bilan_actif = [
     {"Code": "BT", "Intitulé": "TOTAL TRÉSORERIE-ACTIF"},
     {"Code": "BU", "Intitulé": "Écart de conversion-Actif"},
     {"Code": "BZ", "Intitulé": "TOTAL ACTIF"}
-]
\ No newline at end of file
+]
+
+# Rubriques de regroupement : chaque total est la somme des rubriques listées (elles-mêmes éventuellement des totaux)
+totaux_bilan_actif = {
+    "AD": ["AE", "AF", "AG", "AH"],
+    "AI": ["AJ", "AK", "AL", "AM", "AN"],
+    "AQ": ["AR", "AS"],
+    "AZ": ["AD", "AI", "AP", "AQ"],
+    "BG": ["BH", "BI", "BJ"],
+    "BK": ["BA", "BB", "BG"],
+    "BT": ["BQ", "BR", "BS"],
+    "BZ": ["AZ", "BK", "BT", "BU"]
+}
@@ -27,4 +27,14 @@ structure_bilan_passif = [
     {"Code": "DT", "Intitulé": "TOTAL TRÉSORERIE-PASSIF"},
     {"Code": "DV", "Intitulé": "Écart de conversion-Passif"},
     {"Code": "DZ", "Intitulé": "TOTAL PASSIF"}
-]
\ No newline at end of file
+]
+
+# Rubriques de regroupement : chaque total est la somme des rubriques listées (elles-mêmes éventuellement des totaux)
+totaux_bilan_passif = {
+    "CP": ["CA", "CB", "CD", "CE", "CF", "CG", "CH", "CJ", "CL", "CM"],
+    "DD": ["DA", "DB", "DC"],
+    "DF": ["CP", "DD"],
+    "DP": ["DH", "DI", "DJ", "DK", "DM", "DN"],
+    "DT": ["DQ", "DR"],
+    "DZ": ["DF", "DP", "DT", "DV"]
+}
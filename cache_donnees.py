@@ -0,0 +1,122 @@
+import hashlib
+import threading
+import time
+import weakref
+
+# Les DataFrames partagés entre sessions ne doivent jamais être modifiés en place :
+# les pages construisent des vues filtrées ou de nouveaux DataFrames (assign, concat...).
+
+# Durée (en secondes) pendant laquelle un jeu de données sans session est conservé
+DUREE_INACTIVITE = 15 * 60
+
+_registre = {}
+_verrou = threading.RLock()
+
+
+class _Entree:
+    def __init__(self, plan_df, gl_df):
+        self.plan_df = plan_df
+        self.gl_df = gl_df
+        self.derives = {}
+        self.verrous = {}
+        self.references = 0
+        self.dernier_acces = time.monotonic()
+
+
+def cle_contenu(donnees):
+    # Identifiant du jeu de données : empreinte du contenu du fichier importé
+    return hashlib.sha256(donnees).hexdigest()
+
+
+def _purger():
+    maintenant = time.monotonic()
+    for cle in [c for c, e in _registre.items()
+                if e.references <= 0 and maintenant - e.dernier_acces > DUREE_INACTIVITE]:
+        # Les résultats dérivés qui tiennent des ressources (base SQL sur disque...) les libèrent avec le jeu de données
+        for derive in _registre.pop(cle).derives.values():
+            if hasattr(derive, "fermer"):
+                derive.fermer()
+
+
+def _entree(cle):
+    with _verrou:
+        entree = _registre.get(cle)
+        if entree is None:
+            raise KeyError(f"Jeu de données inconnu ou expiré : {cle}")
+        entree.dernier_acces = time.monotonic()
+        return entree
+
+
+def _liberer(cle):
+    with _verrou:
+        entree = _registre.get(cle)
+        if entree is not None:
+            entree.references -= 1
+            entree.dernier_acces = time.monotonic()
+        _purger()
+
+
+def publier(cle, plan_df, gl_df):
+    # Enregistre un jeu de données (si absent) et retourne une poignée pour la session
+    with _verrou:
+        _purger()
+        if cle not in _registre:
+            _registre[cle] = _Entree(plan_df, gl_df)
+        return PoigneeDataset(cle)
+
+
+def enregistrer(cle, charger):
+    # Comme publier(), mais ne lit le fichier que si le contenu n'est pas déjà en mémoire
+    with _verrou:
+        if cle in _registre:
+            return PoigneeDataset(cle)
+    plan_df, gl_df = charger()
+    return publier(cle, plan_df, gl_df)
+
+
+class PoigneeDataset:
+    # Référence légère stockée dans st.session_state à la place des DataFrames.
+    # Le compteur de références est décrémenté à la libération explicite ou
+    # lorsque la session (et donc la poignée) est détruite.
+
+    def __init__(self, cle):
+        self.cle = cle
+        with _verrou:
+            _registre[cle].references += 1
+        self._finaliseur = weakref.finalize(self, _liberer, cle)
+
+    def liberer(self):
+        self._finaliseur()
+
+    @property
+    def plan_df(self):
+        return _entree(self.cle).plan_df
+
+    @property
+    def gl_df(self):
+        return _entree(self.cle).gl_df
+
+    def memoiser(self, cle_calcul, calculer):
+        # Résultat dérivé (balance, bilan...) partagé par toutes les sessions du même fichier.
+        # Un verrou par clé : un seul calcul (une seule base SQL...), les sessions concurrentes attendent son résultat
+        # sans bloquer le registre ni les calculs des autres clés.
+        entree = _entree(self.cle)
+        with _verrou:
+            if cle_calcul in entree.derives:
+                return entree.derives[cle_calcul]
+            verrou_calcul = entree.verrous.setdefault(cle_calcul, threading.Lock())
+        with verrou_calcul:
+            with _verrou:
+                if cle_calcul in entree.derives:
+                    return entree.derives[cle_calcul]
+            resultat = calculer()
+            with _verrou:
+                entree.derives[cle_calcul] = resultat
+                entree.verrous.pop(cle_calcul, None)
+            return resultat
+
+    def derive(self, cle_calcul):
+        # Résultat dérivé déjà calculé, ou None (sans déclencher le calcul)
+        entree = _entree(self.cle)
+        with _verrou:
+            return entree.derives.get(cle_calcul)
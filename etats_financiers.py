@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from bilan_actif import structure_bilan_actif, totaux_bilan_actif
+from bilan_passif import structure_bilan_passif, totaux_bilan_passif
+
+# Rubrique du passif qui reçoit le résultat des comptes de gestion (Tableau = "Résultat")
+RUBRIQUE_RESULTAT = "CJ"
+
+
+def _fermeture(enfants, rubriques):
+    # Matrice rubriques x rubriques : chaque total cumule ses rubriques filles, récursivement (I + C + C² + ...)
+    position = {code: i for i, code in enumerate(rubriques)}
+    lignes = [position[total] for total, filles in enfants.items() for fille in filles]
+    colonnes = [position[fille] for filles in enfants.values() for fille in filles]
+    c = sp.csr_matrix((np.ones(len(lignes)), (lignes, colonnes)), shape=(len(rubriques), len(rubriques)))
+    agregation = sp.identity(len(rubriques), format="csr")
+    puissance = c
+    while puissance.nnz:
+        agregation = agregation + puissance
+        puissance = puissance @ c
+    return agregation
+
+
+class MatriceBilan:
+    # Plan de comptes compilé une fois en matrices creuses :
+    #   correspondance (rubriques x [comptes débiteurs | comptes créditeurs]) issue des colonnes BD / BC,
+    #   agrégation (rubriques x rubriques) des sous-totaux AZ, BK, BT, BZ, CP, DD, DF, DP, DT, DZ...
+    # Un Bilan complet, pour une ou plusieurs balances, est alors un seul produit matriciel creux.
+
+    def __init__(self, plan_df):
+        self.structure = pd.DataFrame(structure_bilan_actif + structure_bilan_passif)
+        self.rubriques = self.structure["Code"].tolist()
+        self.comptes = pd.Index(plan_df["Compte"].astype(str))
+        rubriques = pd.Index(self.rubriques)
+        actif = [d["Code"] for d in structure_bilan_actif]
+        n = len(self.comptes)
+
+        # Un solde débiteur est positif à l'actif et vient en diminution au passif, et inversement
+        lignes, colonnes, valeurs = [], [], []
+        bilan = (plan_df["Tableau"] == "Bilan").to_numpy()
+        for decalage, colonne, signe_actif in [(0, "BD", 1.0), (n, "BC", -1.0)]:
+            if colonne not in plan_df.columns:
+                continue
+            codes = plan_df[colonne].astype(str).str.strip().to_numpy()
+            comptes_mappes = np.flatnonzero(bilan & np.isin(codes, self.rubriques))
+            lignes.append(rubriques.get_indexer(codes[comptes_mappes]))
+            colonnes.append(decalage + comptes_mappes)
+            valeurs.append(np.where(np.isin(codes[comptes_mappes], actif), signe_actif, -signe_actif))
+
+        # Résultat de l'exercice : comptes de gestion créditeurs moins débiteurs, portés en CJ
+        gestion = np.flatnonzero((plan_df["Tableau"] == "Résultat").to_numpy())
+        rang_resultat = np.full(len(gestion), rubriques.get_loc(RUBRIQUE_RESULTAT))
+        lignes += [rang_resultat, rang_resultat]
+        colonnes += [gestion, n + gestion]
+        valeurs += [np.full(len(gestion), -1.0), np.full(len(gestion), 1.0)]
+
+        lignes, colonnes, valeurs = (np.concatenate(v) for v in (lignes, colonnes, valeurs))
+        correspondance = sp.csr_matrix((valeurs, (lignes, colonnes)), shape=(len(self.rubriques), 2 * n))
+        agregation = _fermeture({**totaux_bilan_actif, **totaux_bilan_passif}, self.rubriques)
+        self.matrice = (agregation @ correspondance).tocsr()
+
+    def evaluer(self, balances):
+        # balances : {libellé de colonne (année, entité...) : balance avec Compte, SF Débit, SF Crédit}
+        soldes = []
+        for balance in balances.values():
+            par_compte = balance.groupby(balance["Compte"].astype(str))[["SF Débit", "SF Crédit"]].sum()
+            par_compte = par_compte.reindex(self.comptes, fill_value=0)
+            soldes.append(np.concatenate([par_compte["SF Débit"].to_numpy(), par_compte["SF Crédit"].to_numpy()]))
+        valeurs = self.matrice @ np.column_stack(soldes) if soldes else np.empty((len(self.rubriques), 0))
+        return self.structure.join(pd.DataFrame(valeurs, columns=list(balances)))
+
+    def bilan_actif(self, balances):
+        return self.evaluer(balances).iloc[:len(structure_bilan_actif)].reset_index(drop=True)
+
+    def bilan_passif(self, balances):
+        return self.evaluer(balances).iloc[len(structure_bilan_actif):].reset_index(drop=True)
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+
+def indexer_comptes(gl_df):
+    # Index compte -> (début, fin) des lignes du Grand Livre trié par (Compte, Date)
+    comptes = gl_df["Compte"].to_numpy()
+    if len(comptes) == 0:
+        return {}
+    debuts = np.flatnonzero(np.r_[True, comptes[1:] != comptes[:-1]])
+    fins = np.r_[debuts[1:], len(comptes)]
+    return dict(zip(comptes[debuts], zip(debuts.tolist(), fins.tolist())))
+
+
+def lignes_compte(gl_df, index, compte, annee=None):
+    # Tranche contiguë (sans copie) des écritures d'un compte, éventuellement limitée à une année
+    debut, fin = index.get(compte, (0, 0))
+    if annee is not None and fin > debut:
+        annees = gl_df["Année"].to_numpy()[debut:fin]
+        debut, fin = debut + np.searchsorted(annees, annee, "left"), debut + np.searchsorted(annees, annee, "right")
+    return gl_df.iloc[debut:fin]
+
+
+COLONNES_PAR_COMPTE = ["Date", "Journal", "AN", "Référence", "Compte", "Libellé", "Débit", "Crédit", "Solde progressif"]
+
+
+def grand_livre_par_compte(gl_df, visibles=None):
+    # Solde progressif par compte et par exercice, à-nouveaux en tête, avec une ligne de sous-total par compte.
+    # visibles : masque booléen (aligné sur gl_df) des lignes à afficher ; le solde progressif est cumulé sur
+    # toutes les lignes du compte et de l'exercice, y compris celles masquées (à-nouveaux, mois précédents...)
+    rang = (gl_df["AN"].str.upper() != "OUI").astype(int)
+    visibles = True if visibles is None else np.asarray(visibles, dtype=bool)
+    lignes = gl_df.assign(_rang=rang, _visible=visibles).sort_values(["Compte", "Année", "_rang"], kind="stable")
+    lignes["Solde progressif"] = (lignes["Débit"] - lignes["Crédit"]).groupby([lignes["Compte"], lignes["Année"]]).cumsum()
+    lignes = lignes[lignes["_visible"]]
+
+    # Sous-total des lignes affichées ; le solde est celui atteint à la dernière d'entre elles
+    totaux = lignes.groupby(["Compte", "Année"], sort=False).agg(
+        **{"Débit": ("Débit", "sum"), "Crédit": ("Crédit", "sum"), "Solde progressif": ("Solde progressif", "last")}
+    ).reset_index()
+    totaux["Libellé"] = "Total compte " + totaux["Compte"] + " (" + totaux["Année"].astype(str) + ")"
+    totaux["_rang"] = 2
+
+    # Les sous-totaux (rang 2) se placent après les lignes de leur compte et exercice
+    resultat = pd.concat([lignes, totaux], ignore_index=True).sort_values(["Compte", "Année", "_rang"], kind="stable")
+    colonnes = [col for col in COLONNES_PAR_COMPTE if col in resultat.columns]
+    return resultat[colonnes].fillna({"Date": "", "Journal": "", "AN": "", "Référence": ""}).reset_index(drop=True)
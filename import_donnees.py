@@ -0,0 +1,298 @@
+import io
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:  # lecteur pandas mono-thread en repli
+    pa = None
+
+from cache_donnees import cle_contenu, enregistrer
+from moteur_sql import moteur_sql
+
+FEUILLES = {"Plan de comptes": "A:G", "Grand Livre": "A:J"}
+
+COLONNES_GRAND_LIVRE = ["Date", "Journal", "AN", "Référence", "Compte", "Libellé", "Débit", "Crédit"]
+# Compte auxiliaire (client, fournisseur) facultatif, conservé pour le lettrage des comptes collectifs
+COLONNE_TIERS = "Tiers"
+
+# Correspondance Fichier des Écritures Comptables (FEC) -> colonnes du Grand Livre
+COLONNES_FEC = {
+    "EcritureDate": "Date",
+    "JournalCode": "Journal",
+    "PieceRef": "Référence",
+    "CompteNum": "Compte",
+    "CompteLib": "Intitulé",
+    "CompAuxNum": COLONNE_TIERS,
+    "EcritureLib": "Libellé",
+    "Debit": "Débit",
+    "Credit": "Crédit",
+}
+JOURNAUX_A_NOUVEAUX = ["AN", "ANO", "RAN"]
+FORMATS_DATE = ["%Y%m%d", "%d/%m/%Y", "%Y-%m-%d"]
+# Espaces (y compris insécables) servant de séparateurs de milliers dans les montants
+ESPACES_MONTANT = "[\\s\u00a0]"
+MONTANT_VALIDE = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+# Threads d'orchestration des imports (un par import en cours) et processus de lecture
+# des feuilles : openpyxl est en pur Python, seuls des processus distincts lisent
+# réellement les deux feuilles en parallèle.
+_orchestrateur = ThreadPoolExecutor(max_workers=4, thread_name_prefix="import")
+_lecteurs = None
+_verrou_lecteurs = threading.Lock()
+
+
+def _pool_lecteurs():
+    global _lecteurs
+    with _verrou_lecteurs:
+        if _lecteurs is None:
+            _lecteurs = ProcessPoolExecutor(max_workers=len(FEUILLES), mp_context=multiprocessing.get_context("spawn"))
+        return _lecteurs
+
+
+def _remplacer_pool(pool):
+    # Un processus lecteur tué (mémoire insuffisante...) rend le pool inutilisable : il est recréé au prochain appel
+    global _lecteurs
+    with _verrou_lecteurs:
+        if _lecteurs is pool:
+            _lecteurs = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def standardiser_comptes(serie):
+    return serie.astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+
+
+def normaliser(plan_df, gl_df, montants_invalides=0):
+    # Retourne (plan_df, gl_df, montants_invalides) : nombre de montants non numériques ramenés à 0,
+    # en plus de ceux déjà écartés par le lecteur
+    # Nettoyage des colonnes
+    gl_df.columns = gl_df.columns.str.strip()
+    plan_df.columns = plan_df.columns.str.strip()
+
+    # Standardisation des comptes
+    gl_df["Compte"] = standardiser_comptes(gl_df["Compte"])
+    plan_df["Compte"] = standardiser_comptes(plan_df["Compte"])
+
+    # Dates, années et mois calculés une seule fois à l'import
+    dates = pd.to_datetime(gl_df["Date"], errors="coerce")
+    gl_df["Date"] = dates.dt.strftime("%d/%m/%Y")
+    gl_df["Année"] = dates.dt.year.fillna(0).astype(int)
+    gl_df["Mois"] = dates.dt.strftime("%Y%m")
+
+    # Montants numériques et à-nouveaux renseignés
+    for col in ["Débit", "Crédit"]:
+        montants = pd.to_numeric(gl_df[col], errors="coerce")
+        montants_invalides += int((montants.isna() & gl_df[col].notna()).sum())
+        gl_df[col] = montants.fillna(0)
+    gl_df["AN"] = gl_df["AN"].fillna("NON")
+    if COLONNE_TIERS in gl_df.columns:
+        gl_df[COLONNE_TIERS] = gl_df[COLONNE_TIERS].fillna("").astype(str).str.strip()
+
+    # Grand Livre trié par (Compte, Date) : les écritures d'un compte sont contiguës
+    # (dates manquantes en tête pour que l'année reste croissante dans chaque compte)
+    ordre = pd.DataFrame({"Compte": gl_df["Compte"], "Date": dates}).sort_values(
+        ["Compte", "Date"], kind="stable", na_position="first").index
+    gl_df = gl_df.loc[ordre].reset_index(drop=True)
+
+    return plan_df, gl_df, montants_invalides
+
+
+def _lire_feuille(donnees, feuille, colonnes):
+    return pd.read_excel(io.BytesIO(donnees), sheet_name=feuille, header=0, usecols=colonnes)
+
+
+def lire_classeur(donnees, suivi=None):
+    # Les deux feuilles sont lues simultanément ; suivi(etape, progression) est appelé à chaque étape
+    suivi = suivi or (lambda etape, progression: None)
+    suivi("Lecture des feuilles « Plan de comptes » et « Grand Livre »", 0.05)
+
+    for tentative in range(2):
+        pool = _pool_lecteurs()
+        try:
+            futurs = {pool.submit(_lire_feuille, donnees, feuille, colonnes): feuille for feuille, colonnes in FEUILLES.items()}
+            feuilles = {}
+            for futur in as_completed(futurs):
+                feuille = futurs[futur]
+                feuilles[feuille] = futur.result()
+                suivi(f"Feuille « {feuille} » lue", 0.05 + 0.4 * len(feuilles))
+            break
+        except BrokenProcessPool:
+            _remplacer_pool(pool)
+            if tentative:
+                raise
+
+    suivi("Normalisation des comptes, dates et montants", 0.9)
+    return normaliser(feuilles["Plan de comptes"], feuilles["Grand Livre"])
+
+
+def _entete_texte(donnees):
+    # Encodage, séparateur et noms de colonnes déduits de la première ligne
+    echantillon = donnees[:1 << 20]
+    try:
+        echantillon.decode("utf-8")
+        encodage = "utf-8"
+    except UnicodeDecodeError as e:
+        encodage = "utf-8" if e.start > len(echantillon) - 4 else "latin-1"
+    premiere_ligne = echantillon.split(b"\n", 1)[0].decode(encodage).lstrip("\ufeff").rstrip("\r")
+    separateur = max(["\t", "|", ";", ","], key=premiere_ligne.count)
+    colonnes = [col.strip().strip('"') for col in premiere_ligne.split(separateur)]
+    return encodage, separateur, colonnes
+
+
+def _lire_texte_arrow(donnees, encodage, separateur, colonnes_lues):
+    # Lecteur CSV colonnaire multi-thread : types explicites, dates et montants convertis sans passer par Python
+    table = pa_csv.read_csv(
+        pa.py_buffer(donnees),
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=1 << 24, encoding=encodage),
+        parse_options=pa_csv.ParseOptions(delimiter=separateur),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(colonnes_lues),
+            column_types={col: pa.string() for col in colonnes_lues},
+            strings_can_be_null=True,
+            # Seules les cellules vides sont nulles : "n/a", "NA"... restent des montants invalides, comptés comme tels
+            null_values=[""],
+        ),
+    )
+    colonnes = {}
+    montants_invalides = 0
+    for col, cible in colonnes_lues.items():
+        valeurs = table.column(col)
+        if cible in ("Débit", "Crédit"):
+            valeurs = pc.replace_substring(pc.replace_substring_regex(valeurs, ESPACES_MONTANT, ""), ",", ".")
+            # Montant non numérique -> nul (comme pd.to_numeric(errors="coerce")), puis 0 à la normalisation
+            valides = pc.match_substring_regex(valeurs, MONTANT_VALIDE)
+            montants_invalides += pc.sum(pc.invert(valides)).as_py() or 0
+            valeurs = pc.cast(pc.if_else(valides, valeurs, None), pa.float64())
+        elif cible == "Date":
+            dates = [pc.strptime(valeurs, format=fmt, unit="s", error_is_null=True) for fmt in FORMATS_DATE]
+            valeurs = pc.coalesce(*dates)
+        colonnes[cible] = valeurs
+    return pa.table(colonnes).to_pandas(), montants_invalides
+
+
+def _lire_texte_pandas(donnees, encodage, separateur, colonnes_lues):
+    df = pd.read_csv(io.BytesIO(donnees), sep=separateur, encoding=encodage, usecols=list(colonnes_lues),
+                     dtype={col: str for col in colonnes_lues}, keep_default_na=False, na_values=[""],
+                     encoding_errors="replace")
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns=colonnes_lues)
+    montants_invalides = 0
+    for col in ["Débit", "Crédit"]:
+        montants = df[col].str.replace(ESPACES_MONTANT, "", regex=True).str.replace(",", ".", regex=False)
+        df[col] = pd.to_numeric(montants, errors="coerce")
+        montants_invalides += int((df[col].isna() & montants.notna()).sum())
+    dates = pd.Series(pd.NaT, index=df.index)
+    for fmt in FORMATS_DATE:
+        dates = dates.fillna(pd.to_datetime(df["Date"], format=fmt, errors="coerce"))
+    df["Date"] = dates
+    return df, montants_invalides
+
+
+def _plan_depuis_grand_livre(gl_df):
+    # Plan minimal quand aucun plan de comptes n'accompagne le fichier texte
+    plan_df = gl_df.drop_duplicates("Compte")[["Compte"]].sort_values("Compte").reset_index(drop=True)
+    if "Intitulé" in gl_df.columns:
+        plan_df["Intitulé"] = gl_df.drop_duplicates("Compte").set_index("Compte")["Intitulé"].reindex(plan_df["Compte"]).values
+    else:
+        plan_df["Intitulé"] = ""
+    classe = plan_df["Compte"].astype(str).str[0]
+    plan_df["Tableau"] = ""
+    plan_df.loc[classe.isin(list("12345")), "Tableau"] = "Bilan"
+    plan_df.loc[classe.isin(list("678")), "Tableau"] = "Résultat"
+    for col in ["BD", "BC", "RD", "RC"]:
+        plan_df[col] = ""
+    return plan_df
+
+
+def _lire_plan(donnees):
+    if donnees[:2] == b"PK":
+        return _lire_feuille(donnees, "Plan de comptes", FEUILLES["Plan de comptes"])
+    encodage, separateur, _ = _entete_texte(donnees)
+    return pd.read_csv(io.BytesIO(donnees), sep=separateur, encoding=encodage, dtype={"Compte": str})
+
+
+def lire_texte(donnees, suivi=None, plan=None):
+    # Grand Livre au format texte délimité (FEC ou colonnes de l'application), plan de comptes facultatif
+    suivi = suivi or (lambda etape, progression: None)
+    suivi("Analyse de l'en-tête du fichier texte", 0.05)
+    encodage, separateur, colonnes = _entete_texte(donnees)
+
+    if "CompteNum" in colonnes:
+        colonnes_lues = {col: cible for col, cible in COLONNES_FEC.items() if col in colonnes}
+    else:
+        colonnes_lues = {col: col for col in COLONNES_GRAND_LIVRE + [COLONNE_TIERS, "Intitulé"] if col in colonnes}
+    manquantes = [col for col in COLONNES_GRAND_LIVRE if col != "AN" and col not in colonnes_lues.values()]
+    if manquantes:
+        raise ValueError(f"Colonnes absentes du fichier texte : {', '.join(manquantes)}")
+
+    suivi("Lecture du Grand Livre", 0.1)
+    if pa is not None:
+        gl_df, montants_invalides = _lire_texte_arrow(donnees, encodage, separateur, colonnes_lues)
+    else:
+        gl_df, montants_invalides = _lire_texte_pandas(donnees, encodage, separateur, colonnes_lues)
+    if "AN" not in gl_df.columns:
+        gl_df["AN"] = gl_df["Journal"].str.upper().isin(JOURNAUX_A_NOUVEAUX).map({True: "OUI", False: "NON"})
+
+    suivi("Lecture du plan de comptes", 0.7)
+    plan_df = _lire_plan(plan) if plan else _plan_depuis_grand_livre(gl_df)
+    colonnes_conservees = COLONNES_GRAND_LIVRE + ([COLONNE_TIERS] if COLONNE_TIERS in gl_df.columns else [])
+
+    suivi("Normalisation des comptes, dates et montants", 0.9)
+    return normaliser(plan_df, gl_df[colonnes_conservees], montants_invalides)
+
+
+class TacheImport:
+    # Import exécuté en arrière-plan ; la session le consulte à chaque rerun
+    # et ne bascule sur le nouveau jeu de données qu'une fois celui-ci complet.
+
+    def __init__(self, cle, lire):
+        self.cle = cle
+        self.etape = "En attente"
+        self.progression = 0.0
+        self.erreur = None
+        self.dataset = None
+        self.montants_invalides = 0
+        self._futur = _orchestrateur.submit(self._executer, lire)
+
+    @property
+    def terminee(self):
+        return self._futur.done()
+
+    def _suivre(self, etape, progression):
+        self.etape = etape
+        self.progression = min(progression, 1.0)
+
+    def _charger(self, lire):
+        plan_df, gl_df, self.montants_invalides = lire(self._suivre)
+        return plan_df, gl_df
+
+    def _executer(self, lire):
+        try:
+            # Fichier déjà en mémoire (importé par une autre session) : rien n'est relu
+            self.dataset = enregistrer(self.cle, lambda: self._charger(lire))
+            # Montants écartés conservés avec le jeu de données, pour l'avertissement de la page Import
+            self.montants_invalides = self.dataset.memoiser("montants_invalides", lambda: self.montants_invalides)
+            self._suivre("Import terminé", 1.0)
+            # Base SQL construite ensuite, sans retarder la bascule vers le nouveau jeu de données
+            _orchestrateur.submit(moteur_sql, self.dataset)
+        except Exception as e:
+            self.erreur = e
+
+
+def cle_import(donnees, plan=None):
+    if plan is None:
+        return cle_contenu(donnees)
+    return f"{cle_contenu(donnees)}:{cle_contenu(plan)}"
+
+
+def lancer_import(donnees, lire=lire_classeur, plan=None):
+    if plan is None:
+        return TacheImport(cle_import(donnees), lambda suivi: lire(donnees, suivi))
+    return TacheImport(cle_import(donnees, plan), lambda suivi: lire(donnees, suivi, plan=plan))
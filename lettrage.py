@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+COMPTES_TIERS = ["401", "411"]
+FENETRE_JOURS = 30
+ALPHABET = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+
+
+def _codes_lettres(numeros):
+    # 0 -> "AAA", 1 -> "AAB"... ; la largeur s'adapte au plus grand numéro
+    numeros = np.asarray(numeros, dtype=np.int64)
+    largeur = 3
+    while len(numeros) and numeros.max() >= 26 ** largeur:
+        largeur += 1
+    codes = pd.Series("", index=range(len(numeros)), dtype=object)
+    for position in range(largeur - 1, -1, -1):
+        codes = codes + ALPHABET[(numeros // 26 ** position) % 26]
+    return codes.to_numpy()
+
+
+def _lignes_tiers(gl_df, comptes):
+    tiers = gl_df[gl_df["Compte"].str.startswith(tuple(comptes))]
+    montant = tiers["Débit"] - tiers["Crédit"]
+    lignes = pd.DataFrame({
+        "ligne": tiers.index,
+        "Compte": tiers["Compte"].to_numpy(),
+        "Année": tiers["Année"].to_numpy(),
+        # Compte auxiliaire (FEC) : les pièces de clients différents d'un même collectif ne se lettrent pas entre elles
+        "Tiers": tiers["Tiers"].to_numpy() if "Tiers" in tiers.columns else "",
+        "Référence": tiers["Référence"].fillna("").astype(str).str.strip().to_numpy(),
+        "Date": pd.to_datetime(tiers["Date"], format="%d/%m/%Y", errors="coerce").to_numpy(),
+        "centimes": np.rint(montant.abs().to_numpy() * 100).astype(np.int64),
+        "sens": np.sign(montant.to_numpy()),
+    })
+    return tiers.index, lignes[lignes["sens"] != 0]
+
+
+def _paires_reference(lignes):
+    # Même compte, tiers et exercice, même référence, même montant : jointure par hachage du k-ième débit avec le k-ième crédit
+    cle = ["Compte", "Tiers", "Année", "Référence", "centimes"]
+    lignes = lignes[lignes["Référence"] != ""]
+    debits = lignes[lignes["sens"] > 0]
+    credits = lignes[lignes["sens"] < 0]
+    debits = debits.assign(rang=debits.groupby(cle).cumcount())
+    credits = credits.assign(rang=credits.groupby(cle).cumcount())
+    paires = debits.merge(credits, on=cle + ["rang"], suffixes=("_d", "_c"))
+    return paires[["Compte", "ligne_d", "ligne_c"]]
+
+
+def _paires_date(lignes, fenetre_jours):
+    # Même compte, tiers et exercice, même montant : le k-ième débit (par date) avec le k-ième crédit,
+    # paire retenue si les dates sont dans la fenêtre. Un tri et une jointure par hachage, sans passes successives.
+    cle = ["Compte", "Tiers", "Année", "centimes"]
+    lignes = lignes.dropna(subset=["Date"]).sort_values("Date", kind="stable")
+    debits = lignes[lignes["sens"] > 0]
+    credits = lignes[lignes["sens"] < 0]
+    debits = debits.assign(rang=debits.groupby(cle).cumcount())
+    credits = credits.assign(rang=credits.groupby(cle).cumcount())
+    paires = debits.merge(credits, on=cle + ["rang"], suffixes=("_d", "_c"))
+    ecart = (paires["Date_d"] - paires["Date_c"]).abs()
+    return paires.loc[ecart <= pd.Timedelta(days=fenetre_jours), ["Compte", "ligne_d", "ligne_c"]]
+
+
+def lettrer(gl_df, comptes=COMPTES_TIERS, fenetre_jours=FENETRE_JOURS):
+    # Lettrage automatique débit/crédit des comptes de tiers, en O(n log n), exercice par exercice :
+    # les à-nouveaux d'un exercice reprennent les pièces ouvertes du précédent et se lettrent avec ses règlements.
+    # Retourne, pour chaque ligne des comptes retenus, sa lettre ("" si non lettrée) et la méthode de rapprochement.
+    index_tiers, lignes = _lignes_tiers(gl_df, comptes)
+
+    exactes = _paires_reference(lignes).assign(Méthode="Référence et montant")
+    deja_lettrees = np.concatenate([exactes["ligne_d"].to_numpy(), exactes["ligne_c"].to_numpy()])
+    restantes = lignes[~lignes["ligne"].isin(deja_lettrees)]
+    par_date = _paires_date(restantes, fenetre_jours).assign(Méthode="Montant et date")
+
+    paires = pd.concat([exactes, par_date], ignore_index=True).sort_values(["Compte", "ligne_d"], kind="stable")
+    codes = _codes_lettres(paires.groupby("Compte").cumcount().to_numpy())
+
+    resultat = pd.DataFrame({"Lettre": "", "Méthode": ""}, index=index_tiers)
+    for colonne in ["ligne_d", "ligne_c"]:
+        resultat.loc[paires[colonne].to_numpy(), "Lettre"] = codes
+        resultat.loc[paires[colonne].to_numpy(), "Méthode"] = paires["Méthode"].to_numpy()
+    return resultat
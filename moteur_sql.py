@@ -0,0 +1,142 @@
+import glob
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # SQLite (bibliothèque standard) en repli
+    duckdb = None
+
+# Bases persistées à côté des fichiers importés, une par jeu de données
+DOSSIER_BASES = os.path.join(tempfile.gettempdir(), "syscohada")
+# Bases laissées par un précédent processus (jamais libérées par le registre) supprimées au-delà de ce délai
+DUREE_CONSERVATION = 24 * 60 * 60
+_bases_ouvertes = set()
+
+EXEMPLE_REQUETE = """SELECT "Journal", "Mois", SUM("Débit") AS "Débit", SUM("Crédit") AS "Crédit"
+FROM grand_livre
+WHERE "Compte" LIKE '6%' AND "Année" = 2023
+GROUP BY "Journal", "Mois"
+ORDER BY "Journal", "Mois\""""
+
+INDEX_SQLITE = {
+    "idx_gl_annee_compte": '"Année", "Compte"',
+    "idx_gl_compte_date": '"Compte", "Date"',
+    "idx_gl_journal": '"Journal"',
+}
+
+
+class MoteurSQL:
+    # Grand Livre et plan de comptes exposés en SQL : DuckDB (colonnaire, multi-thread) si disponible, sinon SQLite indexé.
+    # Les tables sont en lecture seule : les requêtes ne peuvent ni modifier les données ni lire d'autres fichiers.
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.moteur = "DuckDB" if duckdb is not None else "SQLite"
+        self._verrou = threading.Lock()
+        _bases_ouvertes.add(chemin)
+        if duckdb is not None:
+            self._connexion = duckdb.connect(chemin, read_only=True, config={"enable_external_access": False})
+
+    @classmethod
+    def ouvrir(cls, cle, plan_df, gl_df):
+        os.makedirs(DOSSIER_BASES, exist_ok=True)
+        _supprimer_anciennes_bases()
+        extension = ".duckdb" if duckdb is not None else ".sqlite"
+        chemin = os.path.join(DOSSIER_BASES, cle.replace(":", "_") + extension)
+        if not os.path.exists(chemin):
+            # Écriture dans un fichier temporaire puis renommage : une base incomplète n'est jamais réutilisée
+            provisoire = f"{chemin}.{threading.get_ident()}.tmp"
+            if duckdb is not None:
+                _creer_duckdb(provisoire, plan_df, gl_df)
+            else:
+                _creer_sqlite(provisoire, plan_df, gl_df)
+            os.replace(provisoire, chemin)
+        else:
+            os.utime(chemin)
+        return cls(chemin)
+
+    def requete(self, sql, parametres=None):
+        if duckdb is not None:
+            # Un curseur par requête : les sessions interrogent la base en parallèle
+            with self._verrou:
+                curseur = self._connexion.cursor()
+            try:
+                return curseur.execute(sql, parametres or []).df()
+            finally:
+                curseur.close()
+        connexion = sqlite3.connect(f"file:{self.chemin}?mode=ro", uri=True)
+        try:
+            return pd.read_sql_query(sql, connexion, params=parametres or [])
+        finally:
+            connexion.close()
+
+    def fermer(self):
+        # Appelé quand le registre évince le jeu de données : la copie disque du Grand Livre est supprimée
+        if duckdb is not None:
+            with self._verrou:
+                self._connexion.close()
+        _bases_ouvertes.discard(self.chemin)
+        for fichier in [self.chemin, self.chemin + ".wal"]:
+            try:
+                os.remove(fichier)
+            except FileNotFoundError:
+                pass
+
+    def tables(self):
+        if duckdb is not None:
+            return self.requete("SELECT table_name AS \"Table\", column_name AS \"Colonne\", data_type AS \"Type\" "
+                                "FROM information_schema.columns ORDER BY table_name, ordinal_position")
+        return self.requete("SELECT m.name AS \"Table\", p.name AS \"Colonne\", p.type AS \"Type\" "
+                            "FROM sqlite_master m JOIN pragma_table_info(m.name) p WHERE m.type = 'table' "
+                            "ORDER BY m.name, p.cid")
+
+
+def _supprimer_anciennes_bases():
+    limite = time.time() - DUREE_CONSERVATION
+    for fichier in glob.glob(os.path.join(DOSSIER_BASES, "*")):
+        if fichier in _bases_ouvertes:
+            continue
+        try:
+            if os.path.getmtime(fichier) < limite:
+                os.remove(fichier)
+        except OSError:
+            pass
+
+
+def _creer_duckdb(chemin, plan_df, gl_df):
+    connexion = duckdb.connect(chemin)
+    try:
+        connexion.register("plan_source", plan_df)
+        connexion.register("gl_source", gl_df)
+        connexion.execute("CREATE TABLE plan_de_comptes AS SELECT * FROM plan_source")
+        # Date au format DATE pour les fonctions de date de DuckDB (date_trunc, year...)
+        connexion.execute("CREATE TABLE grand_livre AS SELECT * REPLACE (strptime(\"Date\", '%d/%m/%Y')::DATE AS \"Date\") "
+                          "FROM gl_source")
+    finally:
+        connexion.close()
+
+
+def _creer_sqlite(chemin, plan_df, gl_df):
+    connexion = sqlite3.connect(chemin)
+    try:
+        plan_df.to_sql("plan_de_comptes", connexion, index=False)
+        # Date au format ISO (AAAA-MM-JJ) pour les fonctions date() et strftime() de SQLite
+        dates = pd.to_datetime(gl_df["Date"], format="%d/%m/%Y", errors="coerce").dt.strftime("%Y-%m-%d")
+        gl_df.assign(Date=dates).to_sql("grand_livre", connexion, index=False, chunksize=50_000)
+        for nom, colonnes in INDEX_SQLITE.items():
+            connexion.execute(f"CREATE INDEX {nom} ON grand_livre ({colonnes})")
+        connexion.execute('CREATE INDEX idx_plan_compte ON plan_de_comptes ("Compte")')
+        connexion.commit()
+    finally:
+        connexion.close()
+
+
+def moteur_sql(dataset):
+    # Moteur partagé par toutes les sessions du même jeu de données (créé au premier appel)
+    return dataset.memoiser("moteur_sql", lambda: MoteurSQL.ouvrir(dataset.cle, dataset.plan_df, dataset.gl_df))
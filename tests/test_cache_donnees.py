@@ -0,0 +1,29 @@
+import threading
+import time
+
+import pandas as pd
+
+import cache_donnees
+
+
+def test_memoiser_calcule_une_seule_fois():
+    # Sessions concurrentes sur le même jeu de données : un seul calcul, le même résultat pour toutes
+    dataset = cache_donnees.publier("test-memoiser", pd.DataFrame(), pd.DataFrame())
+    appels = []
+
+    def calculer():
+        appels.append(1)
+        time.sleep(0.1)
+        return object()
+
+    resultats = []
+    sessions = [threading.Thread(target=lambda: resultats.append(dataset.memoiser("moteur_sql", calculer)))
+                for _ in range(8)]
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+
+    assert len(appels) == 1
+    assert len({id(resultat) for resultat in resultats}) == 1
+    dataset.liberer()
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from etats_financiers import MatriceBilan
+
+PLAN = pd.DataFrame(
+    [
+        ["101000", "Capital social", "Bilan", "CA", "CA"],
+        ["109000", "Actionnaires, capital souscrit non appelé", "Bilan", "CB", ""],
+        ["244100", "Matériel de bureau", "Bilan", "AM", ""],
+        ["284400", "Amortissements du matériel", "Bilan", "", "AM"],
+        ["411000", "Clients", "Bilan", "BI", "DI"],
+        ["521000", "Banques", "Bilan", "BS", "DR"],
+        ["401000", "Fournisseurs", "Bilan", "BH", "DJ"],
+        ["601000", "Achats de marchandises", "Résultat", "", ""],
+        ["681000", "Dotations aux amortissements", "Résultat", "", ""],
+        ["701000", "Ventes de marchandises", "Résultat", "", ""],
+    ],
+    columns=["Compte", "Intitulé", "Tableau", "BD", "BC"],
+)
+
+# Soldes finaux d'un Grand Livre équilibré : apport (capital non appelé 200), achat de matériel à crédit,
+# amortissement, vente à crédit et achat payé par banque
+BALANCE = pd.DataFrame(
+    [
+        ["101000", 0.0, 1000.0],
+        ["109000", 200.0, 0.0],
+        ["244100", 500.0, 0.0],
+        ["284400", 0.0, 100.0],
+        ["411000", 300.0, 0.0],
+        ["521000", 750.0, 0.0],
+        ["401000", 0.0, 500.0],
+        ["601000", 50.0, 0.0],
+        ["681000", 100.0, 0.0],
+        ["701000", 0.0, 300.0],
+    ],
+    columns=["Compte", "SF Débit", "SF Crédit"],
+)
+
+
+def rubriques(bilan):
+    return bilan.set_index("Code")[2023].to_dict()
+
+
+def test_bilan_equilibre():
+    matrice = MatriceBilan(PLAN)
+    actif = rubriques(matrice.bilan_actif({2023: BALANCE}))
+    passif = rubriques(matrice.bilan_passif({2023: BALANCE}))
+
+    assert actif["BZ"] == passif["DZ"] == 1450.0
+    # Capital souscrit non appelé : solde débiteur porté en diminution des capitaux propres
+    assert passif["CB"] == -200.0
+    # Matériel net de ses amortissements
+    assert actif["AM"] == 400.0
+    assert actif["AZ"] == 400.0
+    assert actif["BT"] == 750.0
+
+
+def test_resultat_en_cj():
+    passif = rubriques(MatriceBilan(PLAN).bilan_passif({2023: BALANCE}))
+
+    # Produits (300) moins charges (50 + 100)
+    assert passif["CJ"] == 150.0
+    assert passif["CP"] == 1000.0 - 200.0 + 150.0
+    assert passif["DJ"] == 500.0
+
+
+def test_plusieurs_balances():
+    # Une colonne par balance ; un compte absent d'une balance compte pour 0
+    bilans = MatriceBilan(PLAN).bilan_actif({2022: BALANCE[BALANCE["Compte"] != "411000"], 2023: BALANCE})
+
+    assert bilans.set_index("Code").loc["BI", [2022, 2023]].tolist() == [0.0, 300.0]
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from grand_livre import grand_livre_par_compte
+
+
+def grand_livre(lignes):
+    gl_df = pd.DataFrame(lignes, columns=["Date", "Journal", "AN", "Compte", "Débit", "Crédit"])
+    dates = pd.to_datetime(gl_df["Date"], format="%d/%m/%Y")
+    gl_df["Année"] = dates.dt.year
+    gl_df["Mois"] = dates.dt.month
+    return gl_df
+
+
+GL = [
+    ["15/01/2023", "VT", "NON", "411000", 50.0, 0.0],
+    ["01/01/2023", "AN", "OUI", "411000", 100.0, 0.0],
+    ["10/02/2023", "BQ", "NON", "411000", 0.0, 30.0],
+    ["01/01/2024", "AN", "OUI", "411000", 120.0, 0.0],
+]
+
+
+def test_solde_progressif_a_nouveaux_en_tete():
+    resultat = grand_livre_par_compte(grand_livre(GL))
+
+    assert resultat["Solde progressif"].tolist() == [100.0, 150.0, 120.0, 120.0, 120.0, 120.0]
+    assert resultat["Libellé"].iloc[3] == "Total compte 411000 (2023)"
+
+
+def test_solde_progressif_avec_lignes_masquees():
+    # Filtre Mois = février : le solde repart des à-nouveaux et de janvier, masqués à l'affichage
+    gl_df = grand_livre(GL)
+    resultat = grand_livre_par_compte(gl_df, gl_df["Mois"] == 2)
+
+    assert resultat["Solde progressif"].tolist() == [120.0, 120.0]
+    assert resultat[["Débit", "Crédit"]].iloc[1].tolist() == [0.0, 30.0]
+    assert resultat["Libellé"].iloc[1] == "Total compte 411000 (2023)"
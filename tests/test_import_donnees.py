@@ -0,0 +1,61 @@
+import pytest
+
+import import_donnees
+
+FEC = (
+    "JournalCode\tJournalLib\tEcritureNum\tEcritureDate\tCompteNum\tCompteLib\tCompAuxNum\tCompAuxLib\t"
+    "PieceRef\tPieceDate\tEcritureLib\tDebit\tCredit\tEcritureLet\tDateLet\tValidDate\tMontantdevise\tIdevise\n"
+    "AN\tA nouveaux\t1\t20230101\t411000\tClients\tC001\tDupont\tAN1\t20230101\tReport clients\t1 500,00\t0,00\t\t\t20230101\t\t\n"
+    "VT\tVentes\t2\t20230115\t411000\tClients\tC002\tMartin\tF001\t20230115\tFacture F001\t1 200,50\t0,00\t\t\t20230115\t\t\n"
+    "VT\tVentes\t2\t20230115\t701000\tVentes\t\t\tF001\t20230115\tFacture F001\t0,00\t1200,50\t\t\t20230115\t\t\n"
+    "BQ\tBanque\t3\t20230210\t411000\tClients\tC002\tMartin\tF001\t20230210\tReglement F001\t0,00\tn/a\t\t\t20230210\t\t\n"
+).encode("utf-8")
+
+CSV_APPLICATION = (
+    "Date;Journal;AN;Référence;Compte;Libellé;Débit;Crédit\n"
+    "01/01/2023;AN;OUI;AN1;401000;Report fournisseurs;0;800\n"
+    "20/03/2023;HA;NON;A17;601000;Achat A17;250,75;0\n"
+    "20/03/2023;HA;NON;A17;401000;Achat A17;0;250,75\n"
+).encode("utf-8")
+
+
+@pytest.fixture(params=["arrow", "pandas"])
+def lecteur(request, monkeypatch):
+    if request.param == "arrow":
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(import_donnees, "pa", None)
+    return request.param
+
+
+def test_lire_texte_fec(lecteur):
+    plan_df, gl_df, montants_invalides = import_donnees.lire_texte(FEC)
+
+    assert list(gl_df.columns[:8]) == import_donnees.COLONNES_GRAND_LIVRE
+    assert gl_df["Compte"].tolist() == ["411000", "411000", "411000", "701000"]
+    assert gl_df["Date"].tolist() == ["01/01/2023", "15/01/2023", "10/02/2023", "15/01/2023"]
+    assert gl_df["AN"].tolist() == ["OUI", "NON", "NON", "NON"]
+    assert gl_df["Débit"].tolist() == [1500.0, 1200.5, 0.0, 0.0]
+    # Montant non numérique ramené à 0 et compté, quel que soit le lecteur
+    assert gl_df["Crédit"].tolist() == [0.0, 0.0, 0.0, 1200.5]
+    assert montants_invalides == 1
+    assert gl_df["Tiers"].tolist() == ["C001", "C002", "C002", ""]
+    assert plan_df.set_index("Compte")["Tableau"].to_dict() == {"411000": "Bilan", "701000": "Résultat"}
+
+
+def test_lire_texte_format_application(lecteur):
+    plan_df, gl_df, montants_invalides = import_donnees.lire_texte(CSV_APPLICATION)
+
+    assert gl_df["Compte"].tolist() == ["401000", "401000", "601000"]
+    assert gl_df["AN"].tolist() == ["OUI", "NON", "NON"]
+    assert gl_df["Année"].tolist() == [2023, 2023, 2023]
+    assert gl_df["Mois"].tolist() == ["202301", "202303", "202303"]
+    assert gl_df["Crédit"].tolist() == [800.0, 250.75, 0.0]
+    assert sorted(plan_df["Compte"]) == ["401000", "601000"]
+    assert montants_invalides == 0
+    assert "Tiers" not in gl_df.columns
+
+
+def test_lire_texte_colonnes_manquantes():
+    with pytest.raises(ValueError, match="Crédit"):
+        import_donnees.lire_texte("Date;Journal;Compte;Libellé;Référence;Débit\n01/01/2023;AN;401;x;y;0\n".encode())
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from lettrage import lettrer
+
+
+def grand_livre(lignes):
+    gl_df = pd.DataFrame(lignes, columns=["Date", "AN", "Référence", "Compte", "Débit", "Crédit"])
+    gl_df["Année"] = pd.to_datetime(gl_df["Date"], format="%d/%m/%Y").dt.year
+    return gl_df
+
+
+def test_lettrage_reference_puis_date():
+    gl_df = grand_livre([
+        ["10/01/2023", "NON", "F1", "411000", 100.0, 0.0],
+        ["20/01/2023", "NON", "F1", "411000", 0.0, 100.0],
+        ["05/02/2023", "NON", "F2", "411000", 250.0, 0.0],
+        ["15/02/2023", "NON", "VIR", "411000", 0.0, 250.0],
+        ["01/03/2023", "NON", "F3", "411000", 80.0, 0.0],
+    ])
+    lettrage = lettrer(gl_df)
+
+    assert lettrage["Lettre"].tolist() == ["AAA", "AAA", "AAB", "AAB", ""]
+    assert lettrage["Méthode"].tolist()[:4] == ["Référence et montant"] * 2 + ["Montant et date"] * 2
+
+
+def test_lettrage_par_exercice():
+    # La facture 2023 reste ouverte en 2023 ; en 2024 ce sont ses à-nouveaux qui se lettrent avec le règlement
+    gl_df = grand_livre([
+        ["20/12/2023", "NON", "F9", "411000", 500.0, 0.0],
+        ["01/01/2024", "OUI", "F9", "411000", 500.0, 0.0],
+        ["10/01/2024", "NON", "F9", "411000", 0.0, 500.0],
+    ])
+    lettrage = lettrer(gl_df)
+
+    assert lettrage["Lettre"].tolist() == ["", "AAA", "AAA"]
+
+
+def test_lettrage_montants_identiques():
+    # 15 factures et 15 règlements de même montant et mêmes dates : tout est lettré
+    gl_df = grand_livre(
+        [["10/01/2023", "NON", "", "411000", 100.0, 0.0]] * 15
+        + [["12/01/2023", "NON", "", "411000", 0.0, 100.0]] * 15
+    )
+    lettrage = lettrer(gl_df)
+
+    assert (lettrage["Lettre"] != "").all()
+    assert lettrage["Lettre"].value_counts().eq(2).all()
+
+
+def test_lettrage_hors_fenetre():
+    gl_df = grand_livre([
+        ["10/01/2023", "NON", "", "411000", 100.0, 0.0],
+        ["30/06/2023", "NON", "", "411000", 0.0, 100.0],
+    ])
+
+    assert lettrer(gl_df, fenetre_jours=30)["Lettre"].tolist() == ["", ""]
+
+
+def test_lettrage_par_tiers():
+    # Collectif clients du FEC : la facture de C001 ne se lettre pas avec le règlement de C002
+    gl_df = grand_livre([
+        ["10/01/2023", "NON", "F1", "411000", 100.0, 0.0],
+        ["15/01/2023", "NON", "F1", "411000", 0.0, 100.0],
+        ["20/01/2023", "NON", "F2", "411000", 0.0, 100.0],
+    ]).assign(Tiers=["C001", "C002", "C001"])
+    lettrage = lettrer(gl_df)
+
+    assert lettrage["Lettre"].tolist() == ["AAA", "", "AAA"]
+    assert lettrage["Méthode"].tolist() == ["Montant et date", "", "Montant et date"]